@@ -1,27 +1,27 @@
 import os
-import json
 import datetime
+import orjson
 from openai import OpenAI
 
 def load_config(config_path="config.json"):
     """加载配置文件"""
-    with open(config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(config_path, "rb") as f:
+        return orjson.loads(f.read())
 
 def load_market_data(file_path):
     """读取爬取的币市数据"""
-    with open(file_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(file_path, "rb") as f:
+        return orjson.loads(f.read())
 
-def analyze_with_deepseek(api_key, model, market_data):
-    """调用 DeepSeek API 分析市场数据"""
+def analyze_with_deepseek(api_key, model, market_data, file_path):
+    """调用 DeepSeek API 流式分析市场数据，边接收边写入文件并输出"""
     client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
 
     # 构造输入提示词
     prompt = f"""
 你是一名专业的加密货币分析师。
 以下是来自 OKX 的市场数据：
-{json.dumps(market_data, indent=2)}
+{orjson.dumps(market_data, option=orjson.OPT_INDENT_2).decode()}
 
 请你分析：
 1. 未来走势（上涨/下跌可能性及区间）。
@@ -37,20 +37,27 @@ def analyze_with_deepseek(api_key, model, market_data):
             {"role": "system", "content": "你是专业的加密货币市场分析师。"},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.7
+        temperature=0.7,
+        stream=True
     )
-    return response.choices[0].message.content
 
-def save_result(result_dir, inst_id, analysis):
-    """保存分析结果到文件"""
+    parts = []
+    with open(file_path, "w", encoding="utf-8") as f:
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content or ""
+            f.write(piece)
+            print(piece, end="", flush=True)
+            parts.append(piece)
+
+    return "".join(parts)
+
+def build_result_path(result_dir, inst_id):
+    """生成分析结果文件路径"""
     os.makedirs(result_dir, exist_ok=True)
     filename = f"analysis_{inst_id}_{datetime.datetime.utcnow().strftime('%Y-%m-%d')}.txt"
-    file_path = os.path.join(result_dir, filename)
-
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(analysis)
-
-    return file_path
+    return os.path.join(result_dir, filename)
 
 def main():
     config = load_config()
@@ -63,15 +70,12 @@ def main():
     market_data = load_market_data(data_file)
     inst_id = market_data.get("instId", "Unknown")
 
-    # 调用 DeepSeek
-    analysis = analyze_with_deepseek(api_key, model, market_data)
-
-    # 保存结果
-    result_file = save_result(result_dir, inst_id, analysis)
-
-    print(f"\n✅ 分析完成，结果已保存到: {result_file}\n")
+    # 调用 DeepSeek，结果边接收边保存
+    result_file = build_result_path(result_dir, inst_id)
     print("📊 模型分析结果:\n")
-    print(analysis)
+    analyze_with_deepseek(api_key, model, market_data, result_file)
+
+    print(f"\n\n✅ 分析完成，结果已保存到: {result_file}\n")
 
 if __name__ == "__main__":
     main()
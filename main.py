@@ -1,14 +1,112 @@
 import asyncio
-import json
 import time
-import requests
+import aiohttp
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
 import pandas as pd
 import numpy as np
+import orjson
+from numba import njit
+from okx import OkxPublicWSClient, ClientConfig, Subscription, OKX_BUSINESS_WS_URL
 
 # OKX API配置
 OKX_REST_URL = "https://www.okx.com"
+# 同时进行的REST请求上限，避免触发OKX限频
+MAX_CONCURRENT_REQUESTS = 10
+# 各时间框架对应的K线时长（秒）
+BAR_SECONDS = {"15m": 15 * 60, "1H": 60 * 60, "4H": 4 * 60 * 60}
+# 初始化EMA时拉取的已收盘K线数量
+HISTORY_BARS = 50
+# 每个 (交易对, 时间框架) 环形缓冲区保留的K线数量
+BUFFER_CAPACITY = 200
+
+
+def _make_ema_fn(period: int):
+    """生成固定周期的EMA函数，周期和系数作为常量编译进原生代码"""
+    multiplier = 2.0 / (period + 1)
+    decay = 1.0 - multiplier
+    
+    @njit(cache=True, fastmath=True)
+    def ema_fn(prices):
+        out = np.empty(prices.shape[0])
+        out[:period - 1] = np.nan
+        ema = prices[:period].mean()
+        out[period - 1] = ema
+        for i in range(period, prices.shape[0]):
+            ema = prices[i] * multiplier + ema * decay
+            out[i] = ema
+        return out
+    
+    # 预热JIT，避免首次分析时承担编译开销
+    ema_fn(np.zeros(period, dtype=np.float64))
+    return ema_fn
+
+def resample_candles(candles: List[List], bar_seconds: int) -> List[List[float]]:
+    """将OKX格式（倒序）的小周期K线合成为大周期K线，返回同样倒序的 [ts, o, h, l, c, vol]"""
+    if not candles:
+        return []
+    
+    arr = np.asarray(candles, dtype=object)[::-1, :6].astype(np.float64)
+    bar_ms = bar_seconds * 1000
+    bucket = arr[:, 0] // bar_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    
+    # 最早一组若未从大周期起点开始则不完整，丢弃
+    if arr[0, 0] != bucket[0] * bar_ms:
+        if len(starts) == 1:
+            return []
+        arr = arr[starts[1]:]
+        bucket = bucket[starts[1]:]
+        starts = starts[1:] - starts[1]
+    ends = np.r_[starts[1:], arr.shape[0]] - 1
+    
+    out = np.column_stack([
+        bucket[starts] * bar_ms,
+        arr[starts, 1],
+        np.maximum.reduceat(arr[:, 2], starts),
+        np.minimum.reduceat(arr[:, 3], starts),
+        arr[ends, 4],
+        np.add.reduceat(arr[:, 5], starts),
+    ])
+    return out[::-1].tolist()
+
+# (是否交叉, 交叉方向, 收盘涨跌) -> 信号：金叉且收涨做多，死叉且收跌做空
+_CROSS_SIGNALS = {(True, 1, 1): "做多", (True, -1, -1): "做空"}
+
+@dataclass
+class SymbolBuffers:
+    """单个 (交易对, 时间框架) 已收盘K线的开高低收环形缓冲区，按列连续存储"""
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    head: int = 0
+    count: int = 0
+    
+    @classmethod
+    def with_capacity(cls, capacity: int = BUFFER_CAPACITY) -> "SymbolBuffers":
+        return cls(*(np.empty(capacity, dtype=np.float64) for _ in range(4)))
+    
+    def push(self, open_: float, high: float, low: float, close: float) -> None:
+        """写入一根K线，缓冲区满时覆盖最旧的一根"""
+        i = self.head
+        self.open[i] = open_
+        self.high[i] = high
+        self.low[i] = low
+        self.close[i] = close
+        capacity = self.close.shape[0]
+        self.head = (i + 1) % capacity
+        self.count = min(self.count + 1, capacity)
+    
+    def window(self, period: int, field: str = "close") -> np.ndarray:
+        """按时间顺序返回最近 period 根K线的某一列"""
+        values = getattr(self, field)
+        n = min(period, self.count)
+        start = (self.head - n) % values.shape[0]
+        if start + n <= values.shape[0]:
+            return values[start:start + n].copy()
+        return np.concatenate((values[start:], values[:self.head]))
 
 class EMAAnalyzer:
     """EMA分析器，用于计算EMA和检测金叉死叉信号"""
@@ -16,70 +114,95 @@ class EMAAnalyzer:
     def __init__(self, ema_short: int = 12, ema_long: int = 26):
         self.ema_short = ema_short
         self.ema_long = ema_long
+        # 周期在运行期不变，按周期预先生成专用的EMA函数和递推系数
+        self._ema_fns = {period: _make_ema_fn(period) for period in (ema_short, ema_long)}
+        self._multipliers = {period: 2 / (period + 1) for period in (ema_short, ema_long)}
     
-    def calculate_ema(self, prices: List[float], period: int) -> List[float]:
-        """计算EMA指标"""
-        if len(prices) < period:
-            return [None] * len(prices)
-        
-        ema_values = [None] * len(prices)
-        # 第一个EMA值使用SMA
-        sma = sum(prices[:period]) / period
-        ema_values[period - 1] = sma
-        
-        # 计算后续EMA值
-        multiplier = 2 / (period + 1)
-        for i in range(period, len(prices)):
-            ema_values[i] = (prices[i] * multiplier) + (ema_values[i - 1] * (1 - multiplier))
-        
-        return ema_values
+    def calculate_ema(self, prices: List[float], period: int) -> np.ndarray:
+        """计算EMA指标，前 period-1 个值为 NaN"""
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if prices.shape[0] < period:
+            return np.full(prices.shape[0], np.nan)
+        
+        ema_fn = self._ema_fns.get(period)
+        if ema_fn is None:
+            ema_fn = self._ema_fns[period] = _make_ema_fn(period)
+        return ema_fn(prices)
     
-    def detect_cross_signal(self, ema_short: List[float], ema_long: List[float], 
-                          close_prices: List[float]) -> Optional[str]:
-        """检测金叉死叉信号"""
-        if len(ema_short) < 2 or len(ema_long) < 2 or len(close_prices) < 1:
-            return None
-        
-        # 获取最新的两个EMA值
-        current_short = ema_short[-1]
-        current_long = ema_long[-1]
-        prev_short = ema_short[-2]
-        prev_long = ema_long[-2]
-        current_close = close_prices[-1]
-        
-        if None in [current_short, current_long, prev_short, prev_long]:
-            return None
-        
-        # 检测金叉：短期EMA从下方穿越长期EMA
-        if prev_short <= prev_long and current_short > current_long:
-            if current_close > 0:  # 收盘价为正（上涨）
-                return "做多"
-        
-        # 检测死叉：短期EMA从上方穿越长期EMA
-        if prev_short >= prev_long and current_short < current_long:
-            if current_close < 0:  # 收盘价为负（下跌）
-                return "做空"
-        
-        return None
+    def update_ema(self, prev_ema: float, price: float, period: int) -> float:
+        """EMA单步递推：EMA_n = α·price + (1-α)·EMA_{n-1}"""
+        multiplier = self._multipliers.get(period)
+        if multiplier is None:
+            multiplier = self._multipliers[period] = 2 / (period + 1)
+        return price * multiplier + prev_ema * (1 - multiplier)
+    
+    def detect_cross_signal(self, diff_prev: float, diff_new: float,
+                          last_close_change: float) -> Optional[str]:
+        """根据短期与长期EMA差值的符号变化检测金叉死叉信号"""
+        # 差值由≤0变为>0为金叉，由≥0变为<0为死叉；含NaN时不成立
+        # 输入可能是 NumPy 标量，先转换为 bool 再做符号运算
+        crossed = bool(diff_new * diff_prev <= 0.0 and diff_new != 0.0)
+        direction = 1 if diff_new > 0 else -1
+        change_sign = int(last_close_change > 0) - int(last_close_change < 0)
+        return _CROSS_SIGNALS.get((crossed, direction, change_sign))
+
+class CandleWSClient(OkxPublicWSClient):
+    """订阅K线频道的WebSocket客户端，K线收盘时回调"""
+    
+    def __init__(self, client_config: ClientConfig,
+                 on_bar_close: Callable[[str, str, List[str]], Awaitable[None]]) -> None:
+        super().__init__(client_config)
+        self.on_bar_close = on_bar_close
+    
+    async def _handle_message(self, raw: str) -> None:
+        try:
+            msg = orjson.loads(raw)
+        except Exception:
+            return
+        
+        arg = msg.get("arg")
+        data = msg.get("data")
+        if not arg or not data:
+            return
+        
+        channel = arg.get("channel", "")
+        if not channel.startswith("candle"):
+            return
+        
+        timeframe = channel[len("candle"):]
+        for candle in data:
+            if candle[8] == "1":  # 该K线已收盘
+                await self.on_bar_close(arg.get("instId"), timeframe, candle)
 
 class OKXMonitor:
     """OKX市场数据监视器"""
     
     def __init__(self, symbols: List[str]):
         self.symbols = symbols
+        self.timeframes = list(BAR_SECONDS)
         self.analyzer = EMAAnalyzer()
-        self.last_4h_analysis_hour = -1
-        self.last_1h_analysis_hour = -1
-        self.last_15m_analysis_minute = -1
+        # (交易对, 时间框架) -> 已收盘K线 / (短期EMA, 长期EMA) / 最后一根K线的开盘时间(ms)
+        self._buffers: Dict[Tuple[str, str], SymbolBuffers] = {}
+        self._ema_state: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._last_bar_ts: Dict[Tuple[str, str], int] = {}
+        # 正在后台重新加载历史的键 -> 加载期间收到的K线，加载完成后按序补上
+        self._reloading: Dict[Tuple[str, str], List[List[str]]] = {}
+        self._reload_tasks: set = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        # (交易对, 时间框架) -> (过期时间, K线)，在同一根K线周期内复用
+        self._candle_cache: Dict[Tuple[str, str], Tuple[float, List]] = {}
     
-    def fetch_candles(self, inst_id: str, bar: str, limit: int = 100) -> List[Dict]:
+    async def fetch_candles(self, inst_id: str, bar: str, limit: int = 100) -> List[Dict]:
         """获取K线数据"""
         url = f"{OKX_REST_URL}/api/v5/market/candles"
         params = {"instId": inst_id, "bar": bar, "limit": limit}
         
         try:
-            response = requests.get(url, params=params, timeout=10)
-            data = response.json()
+            async with self._semaphore:
+                async with self._session.get(url, params=params,
+                                             timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    data = await response.json(content_type=None)
             if data.get("code") == "0":
                 return data.get("data", [])
             else:
@@ -89,142 +212,151 @@ class OKXMonitor:
             print(f"获取{inst_id} {bar}数据异常: {e}")
             return []
     
-    def fetch_4h_candles(self, inst_id: str, limit: int = 100) -> List[Dict]:
-        """获取4小时K线数据"""
-        return self.fetch_candles(inst_id, "4H", limit)
-    
-    def fetch_1h_candles(self, inst_id: str, limit: int = 100) -> List[Dict]:
-        """获取1小时K线数据"""
-        return self.fetch_candles(inst_id, "1H", limit)
+    async def get_candles(self, inst_id: str, bar: str, limit: int) -> List:
+        """获取K线数据，优先使用缓存或由已缓存的15分钟K线合成"""
+        now = time.time()
+        cached = self._candle_cache.get((inst_id, bar))
+        if cached and cached[0] > now and len(cached[1]) >= limit:
+            return cached[1][:limit]
+        
+        # 15分钟K线仍在当前周期内时，直接合成更大周期的K线，省去一次请求
+        ratio = BAR_SECONDS[bar] // BAR_SECONDS["15m"]
+        fine = self._candle_cache.get((inst_id, "15m"))
+        if ratio > 1 and fine and fine[0] > now and len(fine[1]) >= limit * ratio:
+            candles = resample_candles(fine[1], BAR_SECONDS[bar])
+            if len(candles) >= limit:
+                return candles[:limit]
+        
+        # 15分钟K线多取一些，足够合成1小时K线
+        fetch_limit = (limit + 1) * 4 if bar == "15m" else limit
+        candles = await self.fetch_candles(inst_id, bar, fetch_limit)
+        if candles:
+            bar_seconds = BAR_SECONDS[bar]
+            expires_at = (now // bar_seconds + 1) * bar_seconds
+            self._candle_cache[(inst_id, bar)] = (expires_at, candles)
+        return candles[:limit]
     
-    def fetch_15m_candles(self, inst_id: str, limit: int = 100) -> List[Dict]:
-        """获取15分钟K线数据"""
-        return self.fetch_candles(inst_id, "15m", limit)
-    
-    def process_candles(self, candles: List[Dict]) -> Dict[str, List[float]]:
+    def process_candles(self, candles: List[List]) -> Dict[str, np.ndarray]:
         """处理K线数据，提取价格信息"""
         if not candles:
-            return {"close": [], "high": [], "low": [], "open": []}
-        
-        # OKX返回的K线数据是倒序的，需要反转
-        candles = list(reversed(candles))
+            empty = np.empty(0, dtype=np.float64)
+            return {"close": empty, "high": empty, "low": empty, "open": empty}
         
-        close_prices = [float(candle[4]) for candle in candles]  # 收盘价
-        high_prices = [float(candle[2]) for candle in candles]   # 最高价
-        low_prices = [float(candle[3]) for candle in candles]    # 最低价
-        open_prices = [float(candle[1]) for candle in candles]   # 开盘价
+        # OKX返回的K线数据是倒序的，需要反转；一次性转换开高低收四列
+        ohlc = np.array(candles, dtype=object)[::-1, 1:5].astype(np.float64)
         
         return {
-            "close": close_prices,
-            "high": high_prices,
-            "low": low_prices,
-            "open": open_prices
+            "close": ohlc[:, 3],
+            "high": ohlc[:, 1],
+            "low": ohlc[:, 2],
+            "open": ohlc[:, 0]
         }
     
-    def calculate_price_change(self, close_prices: List[float]) -> List[float]:
-        """计算价格变化（收盘价相对于前一根K线的变化）"""
-        if len(close_prices) < 2:
-            return [0.0]
-        
-        changes = [0.0]  # 第一根K线变化为0
-        for i in range(1, len(close_prices)):
-            change = close_prices[i] - close_prices[i-1]
-            changes.append(change)
-        
-        return changes
-    
-    def should_analyze_4h_now(self) -> bool:
-        """检查是否应该在当前时间进行4小时分析"""
-        now = datetime.now(timezone.utc)
-        current_hour = now.hour
-        
-        # 检查是否在指定的小时（0,4,8,12,16,20）
-        target_hours = [0, 4, 8, 12, 16, 20]
-        if current_hour not in target_hours:
+    async def load_history(self, symbol: str, timeframe: str, before_ts: Optional[int] = None) -> bool:
+        """用REST拉取已收盘的历史K线，初始化EMA状态，成功返回 True"""
+        # 多取一根，最新一根通常尚未收盘
+        candles = await self.get_candles(symbol, timeframe, HISTORY_BARS + 1)
+        if before_ts is None:
+            before_ts = int(time.time() * 1000) - BAR_SECONDS[timeframe] * 1000 + 1
+        closed = [c for c in candles if int(float(c[0])) < before_ts][:HISTORY_BARS]
+        
+        if len(closed) < 30:  # 确保有足够的数据计算EMA
+            print(f"{symbol} {timeframe} 数据不足，跳过分析")
             return False
         
-        # 确保每个小时只分析一次
-        if current_hour == self.last_4h_analysis_hour:
-            return False
+        price_data = self.process_candles(closed)
+        buffers = SymbolBuffers.with_capacity()
+        for bar in zip(price_data["open"], price_data["high"], price_data["low"], price_data["close"]):
+            buffers.push(*bar)
         
-        # 检查是否在4小时K线的开始时间（0,4,8,12,16,20点的0-5分钟内）
-        current_minute = now.minute
-        if current_minute > 5:  # 只在前5分钟内分析
-            return False
+        # 用SMA起算的完整EMA序列得到当前状态，之后每根K线只需一次递推
+        close_prices = buffers.window(HISTORY_BARS)
+        ema_short = self.analyzer.calculate_ema(close_prices, self.analyzer.ema_short)
+        ema_long = self.analyzer.calculate_ema(close_prices, self.analyzer.ema_long)
         
+        key = (symbol, timeframe)
+        self._buffers[key] = buffers
+        self._ema_state[key] = (ema_short[-1], ema_long[-1])
+        self._last_bar_ts[key] = int(float(closed[0][0]))
         return True
     
-    def should_analyze_1h_now(self) -> bool:
-        """检查是否应该在当前时间进行1小时分析"""
-        now = datetime.now(timezone.utc)
-        current_hour = now.hour
-        current_minute = now.minute
-        
-        # 确保每个小时只分析一次
-        if current_hour == self.last_1h_analysis_hour:
-            return False
-        
-        # 检查是否在1小时K线的开始时间（每小时的0-5分钟内）
-        if current_minute > 5:  # 只在前5分钟内分析
-            return False
-        
-        return True
+    def _drop_state(self, key: Tuple[str, str]) -> None:
+        """清除某个 (交易对, 时间框架) 的K线与EMA状态，下根K线收盘时会重新加载"""
+        self._buffers.pop(key, None)
+        self._ema_state.pop(key, None)
+        self._last_bar_ts.pop(key, None)
     
-    def should_analyze_15m_now(self) -> bool:
-        """检查是否应该在当前时间进行15分钟分析"""
-        now = datetime.now(timezone.utc)
-        current_minute = now.minute
-        
-        # 确保每15分钟只分析一次
-        if current_minute == self.last_15m_analysis_minute:
-            return False
-        
-        # 检查是否在15分钟K线的开始时间（每15分钟的0-2分钟内）
-        minute_in_15m_cycle = current_minute % 15
-        if minute_in_15m_cycle > 2:  # 只在前2分钟内分析
-            return False
-        
-        return True
+    async def on_bar_close(self, symbol: str, timeframe: str, candle: List[str]) -> None:
+        """K线收盘推送：增量更新EMA并分析"""
+        key = (symbol, timeframe)
+        pending = self._reloading.get(key)
+        if pending is not None:  # 历史仍在加载，排队等待
+            pending.append(candle)
+            return
+        
+        ts = int(candle[0])
+        last_ts = self._last_bar_ts.get(key)
+        if last_ts is not None and ts <= last_ts:  # 与历史数据重复
+            return
+        
+        if last_ts is None or ts - last_ts > BAR_SECONDS[timeframe] * 1000:
+            # 尚未初始化或断线期间漏掉了K线：丢弃旧状态，在后台重新拉取历史，
+            # 避免逐个请求阻塞 WS 接收循环
+            self._drop_state(key)
+            self._reloading[key] = [candle]
+            task = asyncio.create_task(self._reload_history(symbol, timeframe))
+            self._reload_tasks.add(task)
+            task.add_done_callback(self._reload_tasks.discard)
+            return
+        
+        self.apply_bar(symbol, timeframe, candle)
+    
+    async def _reload_history(self, symbol: str, timeframe: str) -> None:
+        """重新拉取第一根排队K线之前的历史，再按序补上排队的K线"""
+        key = (symbol, timeframe)
+        try:
+            pending = self._reloading[key]
+            if await self.load_history(symbol, timeframe, before_ts=int(pending[0][0])):
+                for candle in pending:
+                    if int(candle[0]) > self._last_bar_ts[key]:
+                        self.apply_bar(symbol, timeframe, candle)
+        except Exception as e:
+            print(f"加载 {symbol} ({timeframe}) 历史K线异常: {e}")
+            self._drop_state(key)
+        finally:
+            del self._reloading[key]
+    
+    def apply_bar(self, symbol: str, timeframe: str, candle: List[str]) -> None:
+        """把一根已收盘K线写入缓冲区，更新EMA并输出信号"""
+        key = (symbol, timeframe)
+        ts = int(candle[0])
+        self._buffers[key].push(float(candle[1]), float(candle[2]), float(candle[3]), float(candle[4]))
+        signal = self.analyze_symbol(symbol, timeframe)
+        self._last_bar_ts[key] = ts
+        if signal:
+            bar_time = datetime.fromtimestamp(ts / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M")
+            print(f"🎯 [{bar_time} UTC] {signal}")
     
     def analyze_symbol(self, symbol: str, timeframe: str) -> Optional[str]:
-        """分析单个交易对"""
-        print(f"正在分析 {symbol} ({timeframe})...")
+        """用最新收盘的K线更新单个交易对的EMA并检测信号"""
+        key = (symbol, timeframe)
+        close_prices = self._buffers[key].window(2)
+        close = close_prices[-1]
+        prev_short, prev_long = self._ema_state[key]
         
-        # 根据时间框架获取K线数据
-        if timeframe == "4H":
-            candles = self.fetch_4h_candles(symbol, 50)  # 获取50根4小时K线
-        elif timeframe == "1H":
-            candles = self.fetch_1h_candles(symbol, 50)  # 获取50根1小时K线
-        elif timeframe == "15m":
-            candles = self.fetch_15m_candles(symbol, 50)  # 获取50根15分钟K线
-        else:
-            print(f"不支持的时间框架: {timeframe}")
-            return None
-        
-        if not candles:
-            print(f"无法获取 {symbol} 的{timeframe}K线数据")
-            return None
-        
-        # 处理K线数据
-        price_data = self.process_candles(candles)
-        close_prices = price_data["close"]
-        
-        if len(close_prices) < 30:  # 确保有足够的数据计算EMA
-            print(f"{symbol} {timeframe} 数据不足，跳过分析")
-            return None
-        
-        # 计算EMA
-        ema_short = self.analyzer.calculate_ema(close_prices, self.analyzer.ema_short)
-        ema_long = self.analyzer.calculate_ema(close_prices, self.analyzer.ema_long)
+        # 递推EMA
+        ema_short = self.analyzer.update_ema(prev_short, close, self.analyzer.ema_short)
+        ema_long = self.analyzer.update_ema(prev_long, close, self.analyzer.ema_long)
+        self._ema_state[key] = (ema_short, ema_long)
         
-        # 计算价格变化
-        price_changes = self.calculate_price_change(close_prices)
+        # 最新收盘价相对于前一根K线的变化
+        last_change = close_prices[-1] - close_prices[-2] if len(close_prices) > 1 else 0.0
         
         # 检测金叉死叉信号
-        signal = self.analyzer.detect_cross_signal(ema_short, ema_long, price_changes)
+        signal = self.analyzer.detect_cross_signal(prev_short - prev_long, ema_short - ema_long,
+                                                   last_change)
         
         if signal:
-            print(f"🎯 {symbol} ({timeframe}) {signal}")
             return f"{symbol} ({timeframe}) {signal}"
         
         return None
@@ -233,106 +365,35 @@ class OKXMonitor:
         """运行监视器"""
         print("🚀 OKX EMA金叉死叉监视器启动")
         print("📊 监视交易对:", ", ".join(self.symbols))
-        print("⏰ 4H分析时间点: 0, 4, 8, 12, 16, 20点（UTC时间）")
-        print("⏰ 1H分析时间点: 每小时（UTC时间）")
-        print("⏰ 15m分析时间点: 每15分钟（UTC时间）")
+        print("⏰ 分析时间点: " + ", ".join(self.timeframes) + " K线收盘时（WebSocket推送）")
         print("📈 策略: EMA12上穿EMA26且收盘为正 -> 做多")
         print("📉 策略: EMA12下穿EMA26且收盘为负 -> 做空")
         print("-" * 60)
         
-        while True:
+        async with aiohttp.ClientSession() as session:
+            self._session = session
+            
+            # 由细到粗加载历史，大周期可复用已缓存的15分钟K线
+            print("📥 加载历史K线...")
+            for timeframe in self.timeframes:
+                results = await asyncio.gather(
+                    *[self.load_history(symbol, timeframe) for symbol in self.symbols],
+                    return_exceptions=True
+                )
+                for symbol, result in zip(self.symbols, results):
+                    if isinstance(result, Exception):
+                        print(f"加载 {symbol} ({timeframe}) 历史K线异常: {result}")
+            print("-" * 60)
+            
+            subs = [Subscription(channel=f"candle{timeframe}", inst_id=symbol)
+                    for symbol in self.symbols for timeframe in self.timeframes]
+            client = CandleWSClient(ClientConfig(url=OKX_BUSINESS_WS_URL), self.on_bar_close)
+            client.set_subscriptions(subs)
+            
             try:
-                current_time = datetime.now(timezone.utc)
-                all_signals = []
-                analysis_performed = False
-                
-                # 检查4小时分析
-                if self.should_analyze_4h_now():
-                    print(f"⏰ 当前时间: {current_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-                    print("🔍 开始4小时分析...")
-                    self.last_4h_analysis_hour = current_time.hour
-                    analysis_performed = True
-                    
-                    signals_4h = []
-                    for symbol in self.symbols:
-                        signal = self.analyze_symbol(symbol, "4H")
-                        if signal:
-                            signals_4h.append(signal)
-                    
-                    if signals_4h:
-                        print("🎯 发现4小时交易信号:")
-                        for signal in signals_4h:
-                            print(f"  ✅ {signal}")
-                        all_signals.extend(signals_4h)
-                    else:
-                        print("❌ 4小时分析无交易信号")
-                
-                # 检查1小时分析
-                if self.should_analyze_1h_now():
-                    print(f"⏰ 当前时间: {current_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-                    print("🔍 开始1小时分析...")
-                    self.last_1h_analysis_hour = current_time.hour
-                    analysis_performed = True
-                    
-                    signals_1h = []
-                    for symbol in self.symbols:
-                        signal = self.analyze_symbol(symbol, "1H")
-                        if signal:
-                            signals_1h.append(signal)
-                    
-                    if signals_1h:
-                        print("🎯 发现1小时交易信号:")
-                        for signal in signals_1h:
-                            print(f"  ✅ {signal}")
-                        all_signals.extend(signals_1h)
-                    else:
-                        print("❌ 1小时分析无交易信号")
-                
-                # 检查15分钟分析
-                if self.should_analyze_15m_now():
-                    print(f"⏰ 当前时间: {current_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-                    print("🔍 开始15分钟分析...")
-                    self.last_15m_analysis_minute = current_time.minute
-                    analysis_performed = True
-                    
-                    signals_15m = []
-                    for symbol in self.symbols:
-                        signal = self.analyze_symbol(symbol, "15m")
-                        if signal:
-                            signals_15m.append(signal)
-                    
-                    if signals_15m:
-                        print("🎯 发现15分钟交易信号:")
-                        for signal in signals_15m:
-                            print(f"  ✅ {signal}")
-                        all_signals.extend(signals_15m)
-                    else:
-                        print("❌ 15分钟分析无交易信号")
-                
-                # 输出所有信号汇总
-                if all_signals:
-                    print("📊 信号汇总:")
-                    for signal in all_signals:
-                        print(f"  🎯 {signal}")
-                elif analysis_performed:
-                    print("❌ 当前无任何交易信号")
-                
-                # 如果没有任何分析，显示静默等待信息（每10分钟显示一次）
-                if not analysis_performed and current_time.minute % 10 == 0:
-                    print(f"⏳ 等待分析时间点... ({current_time.strftime('%H:%M')} UTC)")
-                
-                if analysis_performed:
-                    print("-" * 60)
-                
-                # 每分钟检查一次
-                await asyncio.sleep(60)
-                
-            except KeyboardInterrupt:
+                await client.run_forever()
+            finally:
                 print("\n🛑 监视器已停止")
-                break
-            except Exception as e:
-                print(f"❌ 运行异常: {e}")
-                await asyncio.sleep(60)
 
 async def main():
     """主函数"""
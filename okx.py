@@ -1,55 +1,93 @@
 import asyncio
-import json
 import os
 import time
 import traceback
 import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from datetime import datetime, timezone
+import orjson
 import websockets
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 OKX_PUBLIC_WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
+# K线频道在 business 端点推送
+OKX_BUSINESS_WS_URL = "wss://ws.okx.com:8443/ws/v5/business"
 OKX_REST_URL = "https://www.okx.com"
 
+# 接收时间戳按秒缓存，同一秒内的消息复用格式化结果
+_ts_cache = {"sec": 0, "str": ""}
+
 
 # ---------------- REST 部分 ----------------
 
+# 共享连接池，复用 TCP/TLS 连接
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                       max_retries=Retry(total=2, backoff_factor=0.2)))
+
+
 def fetch_candles(inst_id: str, bar: str = "1m", limit: int = 100):
     url = f"{OKX_REST_URL}/api/v5/market/candles"
     params = {"instId": inst_id, "bar": bar, "limit": limit}
-    return requests.get(url, params=params, timeout=10).json()
+    return _SESSION.get(url, params=params, timeout=10).json()
 
 
 def fetch_trades(inst_id: str, limit: int = 50):
     url = f"{OKX_REST_URL}/api/v5/market/trades"
     params = {"instId": inst_id, "limit": limit}
-    return requests.get(url, params=params, timeout=10).json()
+    return _SESSION.get(url, params=params, timeout=10).json()
 
 
 def fetch_orderbook(inst_id: str, sz: int = 50):
     url = f"{OKX_REST_URL}/api/v5/market/books"
     params = {"instId": inst_id, "sz": sz}
-    return requests.get(url, params=params, timeout=10).json()
+    return _SESSION.get(url, params=params, timeout=10).json()
 
 
 def fetch_ticker(inst_id: str):
     url = f"{OKX_REST_URL}/api/v5/market/ticker"
     params = {"instId": inst_id}
-    return requests.get(url, params=params, timeout=10).json()
+    return _SESSION.get(url, params=params, timeout=10).json()
+
+
+def fetch_all_tickers(inst_type: str = "SPOT") -> Optional[Dict[str, Dict[str, Any]]]:
+    """一次请求拉取该类型全部交易对的行情，按 instId 索引；请求失败返回 None"""
+    url = f"{OKX_REST_URL}/api/v5/market/tickers"
+    params = {"instType": inst_type}
+    resp = _SESSION.get(url, params=params, timeout=10).json()
+    if resp.get("code") != "0":
+        return None
+    return {d["instId"]: d for d in resp.get("data", [])}
 
 
-def save_rest_data(inst_id: str, output_dir="./okx_out/history"):
+def save_rest_data(inst_id: str, output_dir="./okx_out/history",
+                   tickers: Optional[Dict[str, Dict[str, Any]]] = None):
     os.makedirs(output_dir, exist_ok=True)
     ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    candles = fetch_candles(inst_id, "1m", 100).get("data", [])
-    trades = fetch_trades(inst_id, 50).get("data", [])
-    orderbook = fetch_orderbook(inst_id, 50).get("data", [])
-    ticker = fetch_ticker(inst_id).get("data", [])
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        candles_future = pool.submit(fetch_candles, inst_id, "1m", 100)
+        trades_future = pool.submit(fetch_trades, inst_id, 50)
+        orderbook_future = pool.submit(fetch_orderbook, inst_id, 50)
+        # 已批量拉取到该交易对的行情时直接查表，否则单独请求
+        if tickers is None or inst_id not in tickers:
+            ticker_future = pool.submit(fetch_ticker, inst_id)
+        else:
+            ticker_future = None
+
+    candles = candles_future.result().get("data", [])
+    trades = trades_future.result().get("data", [])
+    orderbook = orderbook_future.result().get("data", [])
+    if ticker_future is not None:
+        ticker = ticker_future.result().get("data", [])
+    else:
+        ticker = [tickers[inst_id]]
 
     payload = {
         "instId": inst_id,
@@ -64,8 +102,8 @@ def save_rest_data(inst_id: str, output_dir="./okx_out/history"):
     }
 
     path = os.path.join(output_dir, f"{inst_id}.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
 
 
 # ---------------- WebSocket 部分 ----------------
@@ -91,53 +129,129 @@ class ClientConfig:
     ping_interval_seconds: int = 15
     reconnect_base_delay_seconds: float = 1.0
     reconnect_max_delay_seconds: float = 30.0
+    # 协商 permessage-deflate 压缩，减小 books 等大帧的传输量
+    compression: Optional[str] = "deflate"
+
+
+def _append_bytes(path: str, data: bytes) -> None:
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def handle_frame(raw: str, pending: Dict[Tuple[str, str], bytearray]) -> None:
+    """解析一条 WS 消息，作为一行 NDJSON 追加到对应 (instId, channel) 的缓冲区"""
+    # 控制帧（pong/subscribe/error）无需解析
+    if raw.startswith('{"event"'):
+        return
+
+    try:
+        msg = orjson.loads(raw)
+    except Exception:
+        return
+
+    try:
+        arg = msg["arg"]
+        data = msg["data"]
+        channel = arg["channel"]
+        inst_id = arg["instId"]
+    except (KeyError, TypeError):
+        return
+    if not data:
+        return
+
+    now_s = int(time.time())
+    if now_s != _ts_cache["sec"]:
+        _ts_cache["sec"] = now_s
+        _ts_cache["str"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now_s))
+
+    payload = {
+        "instId": inst_id,
+        "timestamp": _ts_cache["str"],
+        "source": "WS",
+        "channel": channel,
+        "data": data
+    }
+    action = msg.get("action")
+    if action is not None:
+        payload["action"] = action
+
+    key = (inst_id, channel)
+    buffer = pending.get(key)
+    if buffer is None:
+        buffer = pending[key] = bytearray()
+    buffer += orjson.dumps(payload)
+    buffer += b"\n"
+
+
+try:
+    # 编译过 okx_hot.pyx 时使用 Cython 实现
+    from okx_hot import handle_frame  # noqa: F811
+except ImportError:
+    pass
 
 
 class RollingJsonWriter:
+    """按 (instId, channel) 追加写入 NDJSON 文件，每 file_rotate_seconds 切换新文件"""
+
     def __init__(self, config: WriterConfig) -> None:
         self.config = config
         os.makedirs(self.config.output_dir, exist_ok=True)
+        self._files: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._pending: Dict[Tuple[str, str], bytearray] = {}
 
     def _build_filename(self, inst_id: str, channel: str, epoch_ms: int) -> str:
         ts = time.strftime("%Y%m%dT%H%M%S", time.gmtime(epoch_ms / 1000))
-        base = f"{inst_id}_{channel}_{ts}.json"
+        base = f"{inst_id}_{channel}_{ts}.ndjson"
         return os.path.join(self.config.output_dir, base)
 
-    async def flush_buffers(self, buffers: Dict[Tuple[str, str], List[Dict[str, Any]]], now_ms: int) -> None:
-        for (inst_id, channel), messages in list(buffers.items()):
-            if not messages:
+    def write_frame(self, raw: str) -> None:
+        handle_frame(raw, self._pending)
+
+    def _take_pending(self, now_ms: int) -> List[Tuple[str, bytearray]]:
+        rotate_ms = self.config.file_rotate_seconds * 1000
+        items = []
+        for key, pending in self._pending.items():
+            if not pending:
                 continue
-            path = self._build_filename(inst_id, channel, now_ms)
-            try:
-                with open(path, "w", encoding="utf-8") as f:
-                    json.dump(messages, f, ensure_ascii=False, indent=2)
-            except Exception:
-                traceback.print_exc()
-            finally:
-                buffers[(inst_id, channel)] = []
+            entry = self._files.get(key)
+            if entry is None or now_ms - entry[0] >= rotate_ms:
+                entry = self._files[key] = (now_ms, self._build_filename(key[0], key[1], now_ms))
+            items.append((entry[1], pending))
+            self._pending[key] = bytearray()
+        return items
+
+    async def flush(self, now_ms: int) -> None:
+        # 磁盘写入放到线程中，避免阻塞接收 WS 消息的事件循环
+        items = self._take_pending(now_ms)
+        results = await asyncio.gather(
+            *[asyncio.to_thread(_append_bytes, path, data) for path, data in items],
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                traceback.print_exception(type(result), result, result.__traceback__)
+
+    def close(self) -> None:
+        for path, data in self._take_pending(int(time.time() * 1000)):
+            with contextlib.suppress(Exception):
+                _append_bytes(path, data)
 
 
 class OkxPublicWSClient:
-    def __init__(self, client_config: ClientConfig, writer: RollingJsonWriter) -> None:
+    def __init__(self, client_config: ClientConfig, writer: Optional[RollingJsonWriter] = None) -> None:
         self.client_config = client_config
         self.writer = writer
         self._ws: Optional[websockets.WebSocketClientProtocol] = None
         self._subscriptions: List[Subscription] = []
-        self._buffers: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
-        self._last_flush_ms: int = 0
         self._stop: bool = False
 
     def set_subscriptions(self, subscriptions: List[Subscription]) -> None:
         self._subscriptions = subscriptions
-        for sub in subscriptions:
-            key = (sub.inst_id, sub.channel)
-            if key not in self._buffers:
-                self._buffers[key] = []
 
     async def _send(self, payload: Dict[str, Any]) -> None:
         if self._ws is None:
             return
-        await self._ws.send(json.dumps(payload, separators=(",", ":")))
+        await self._ws.send(orjson.dumps(payload).decode())
 
     async def _subscribe_all(self) -> None:
         if not self._subscriptions:
@@ -153,58 +267,22 @@ class OkxPublicWSClient:
             except Exception:
                 break
 
-    async def _flush_loop(self, rotate_seconds: int) -> None:
-        rotate_ms = rotate_seconds * 1000
+    async def _flush_loop(self) -> None:
         while not self._stop:
             try:
                 await asyncio.sleep(1)
-                now_ms = int(time.time() * 1000)
-                if self._last_flush_ms == 0:
-                    self._last_flush_ms = now_ms
-                if now_ms - self._last_flush_ms >= rotate_ms:
-                    await self.writer.flush_buffers(self._buffers, now_ms)
-                    self._last_flush_ms = now_ms
+                await self.writer.flush(int(time.time() * 1000))
             except Exception:
                 traceback.print_exc()
 
     async def _handle_message(self, raw: str) -> None:
-        try:
-            msg = json.loads(raw)
-        except Exception:
-            return
-
-        if isinstance(msg, dict) and msg.get("event") in {"pong", "subscribe", "error"}:
-            return
-
-        arg = msg.get("arg")
-        data = msg.get("data")
-        action = msg.get("action")
-        if not arg or not data:
-            return
-
-        channel = arg.get("channel")
-        inst_id = arg.get("instId")
-        key = (inst_id, channel)
-
-        if key not in self._buffers:
-            self._buffers[key] = []
-
-        ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        payload = {
-            "instId": inst_id,
-            "timestamp": ts,
-            "source": "WS",
-            "channel": channel,
-            "data": data
-        }
-        if action is not None:
-            payload["action"] = action
-
-        self._buffers[key].append(payload)
+        if self.writer is not None:
+            self.writer.write_frame(raw)
 
     async def _connect_once(self) -> None:
         assert self._subscriptions, "未设置订阅频道"
-        async with websockets.connect(self.client_config.url, ping_interval=None) as ws:
+        async with websockets.connect(self.client_config.url, ping_interval=None,
+                                      compression=self.client_config.compression) as ws:
             self._ws = ws
             await self._subscribe_all()
 
@@ -217,9 +295,11 @@ class OkxPublicWSClient:
                 with contextlib.suppress(Exception):
                     await ping_task
 
-    async def run_forever(self, rotate_seconds: int) -> None:
+    async def run_forever(self) -> None:
         self._stop = False
-        flush_task = asyncio.create_task(self._flush_loop(rotate_seconds))
+        flush_task = None
+        if self.writer is not None:
+            flush_task = asyncio.create_task(self._flush_loop())
         delay = self.client_config.reconnect_base_delay_seconds
         try:
             while not self._stop:
@@ -232,9 +312,13 @@ class OkxPublicWSClient:
                     delay = min(delay * 2, self.client_config.reconnect_max_delay_seconds)
         finally:
             self._stop = True
-            flush_task.cancel()
-            with contextlib.suppress(Exception):
-                await flush_task
+            if flush_task is not None:
+                flush_task.cancel()
+                try:
+                    # CancelledError 不是 Exception，用 gather 收掉，确保下面的 close 执行
+                    await asyncio.gather(flush_task, return_exceptions=True)
+                finally:
+                    self.writer.close()
 
 
 # ---------------- 主程序 ----------------
@@ -250,9 +334,10 @@ async def main():
 
     channels = ["tickers", "trades", "books", "candle1m"]
 
-    # 先用 REST 拉一次全量历史数据
+    # 先用 REST 拉一次全量历史数据，行情一次批量获取
+    tickers = fetch_all_tickers("SPOT")
     for symbol in symbols:
-        save_rest_data(symbol)
+        save_rest_data(symbol, tickers=tickers)
 
     # 再启动 WebSocket 实时订阅
     subs = [Subscription(channel=c, inst_id=s) for s in symbols for c in channels]
@@ -260,7 +345,7 @@ async def main():
     client = OkxPublicWSClient(ClientConfig(), writer)
     client.set_subscriptions(subs)
 
-    await client.run_forever(rotate_seconds=writer.config.file_rotate_seconds)
+    await client.run_forever()
 
 
 if __name__ == "__main__":
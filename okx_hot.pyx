@@ -0,0 +1,76 @@
+# cython: language_level=3
+"""okx.handle_frame 的 Cython 实现，WS 接收热路径
+
+编译: cythonize -i --annotate okx_hot.pyx
+未编译时 okx.py 自动回退到纯 Python 版本，两者行为一致。
+"""
+from libc.time cimport time_t, tm, gmtime, strftime
+from libc.time cimport time as c_time
+import orjson
+
+cdef object _loads = orjson.loads
+cdef object _dumps = orjson.dumps
+
+# 接收时间戳按秒缓存
+cdef time_t _ts_sec = 0
+cdef str _ts_str = ""
+
+
+cdef str _utc_timestamp():
+    global _ts_sec, _ts_str
+    cdef time_t now = c_time(NULL)
+    cdef char buf[32]
+    cdef tm* t
+    if now != _ts_sec:
+        _ts_sec = now
+        t = gmtime(&now)
+        strftime(buf, sizeof(buf), b"%Y-%m-%dT%H:%M:%SZ", t)
+        _ts_str = buf.decode("ascii")
+    return _ts_str
+
+
+cpdef handle_frame(str raw, dict pending):
+    """解析一条 WS 消息，作为一行 NDJSON 追加到对应 (instId, channel) 的缓冲区"""
+    cdef dict msg, arg, payload
+    cdef tuple key
+    cdef object obj, data, action, buffer
+
+    # 控制帧（pong/subscribe/error）无需解析
+    if raw.startswith('{"event"'):
+        return
+
+    try:
+        obj = _loads(raw)
+    except Exception:
+        return
+    if type(obj) is not dict:
+        return
+    msg = <dict>obj
+
+    obj = msg.get("arg")
+    data = msg.get("data")
+    if type(obj) is not dict or not data:
+        return
+    arg = <dict>obj
+    channel = arg.get("channel")
+    inst_id = arg.get("instId")
+    if channel is None or inst_id is None:
+        return
+
+    payload = {
+        "instId": inst_id,
+        "timestamp": _utc_timestamp(),
+        "source": "WS",
+        "channel": channel,
+        "data": data
+    }
+    action = msg.get("action")
+    if action is not None:
+        payload["action"] = action
+
+    key = (inst_id, channel)
+    buffer = pending.get(key)
+    if buffer is None:
+        buffer = pending[key] = bytearray()
+    buffer += _dumps(payload)
+    buffer += b"\n"